@@ -1,8 +1,7 @@
 """Optional module."""
 
 import functools
-from abc import ABC, abstractmethod
-from collections.abc import Callable
+from collections.abc import Callable, Iterable, Iterator
 from copy import copy
 from typing import Any, Generic, TypeVar
 
@@ -12,28 +11,129 @@ T = TypeVar("T")
 
 __all__ = ["Optional", "optional"]
 
+_MAP = 0
+_FILTER = 1
+_PEEK = 2
+_FLAT_MAP = 3
+
+# Returned instead of a value when the Optional is empty.
+_MISSING: Any = object()
+
+
+def _is_none(value: object) -> bool:
+    """Test if value is None, the default emptiness test.
+
+    The evaluators recognize it by identity and inline the test.
+
+    Returns:
+        bool.
+
+    """
+    return value is None
+
+
+def _is_always_empty(value: object) -> bool:  # noqa: ARG001
+    """Test used by OptionalEmpty, for which every value is empty.
+
+    Returns:
+        bool.
+
+    """
+    return True
+
 
 class MissingValueError(ValueError):
     def __init__(self) -> None:
         super().__init__("Optional is empty")
 
 
+@functools.lru_cache(maxsize=256)
+def _compile_ops(
+    tags: tuple[int, ...],
+    is_none: bool,  # noqa: FBT001
+    batch: bool,  # noqa: FBT001
+) -> Callable[..., Callable[[Any], Any]]:
+    """Generate the code running a chain of operations of the given kinds.
+
+    The code is generated once per chain shape and returned as a factory binding
+    the emptiness test and the operation callbacks as closure variables.
+
+    Args:
+        tags (tuple[int, ...]): The kinds of the operations, in order.
+        is_none (bool): Whether the emptiness test is the default None test.
+        batch (bool): Generate a generator over an iterable of values, skipping
+                      empty results, instead of a function of a single value.
+
+    Returns:
+        Callable[..., Callable[[Any], Any]]: The factory of the compiled function.
+
+    """
+    empty = "v is None" if is_none else "is_empty(v)"
+    missing = "continue" if batch else "raise MissingValueError"
+    names = [f"f{index}" for index in range(len(tags))]
+    body = [f"if {empty}: {missing}"]
+    for name, tag in zip(names, tags, strict=True):
+        if tag == _MAP:
+            body += [f"v = {name}(v)", f"if v is _MISSING or {empty}: {missing}"]
+        elif tag == _FILTER:
+            body += [f"if not {name}(v): {missing}"]
+        elif tag == _PEEK:
+            body += [f"{name}(copy(v))"]
+        else:
+            body += [
+                f"v = {name}(v)",
+                "v = v._source_value() if v._parent is None else v._try_value()",
+                f"if v is _MISSING or {empty}: {missing}",
+            ]
+    if batch:
+        run = ["    def _run(values):", "        for v in values:"]
+        run += [f"            {line}" for line in body]
+        run += ["            yield v"]
+    else:
+        run = ["    def _run(v):"]
+        run += [f"        {line}" for line in body]
+        run += ["        return v"]
+    source = "\n".join(
+        [f"def _make({', '.join(['is_empty', *names])}):", *run, "    return _run"]
+    )
+    namespace: dict[str, Any] = {
+        "_MISSING": _MISSING,
+        "MissingValueError": MissingValueError,
+        "copy": copy,
+    }
+    exec(source, namespace)  # noqa: S102
+    return namespace["_make"]
+
+
 class Optional(Generic[T]):
     """A class representing an optional value, which may or may not contain a value.
 
+    Transformations are not stored as a chain of nodes: each one returns a new
+    Optional sharing the same source and holding the operations to apply to the
+    source value, as a linked list extended in constant time and flattened on the
+    first evaluation.
+
     Attributes:
         _value (T | None): The optional value.
         _is_empty (Callable[[T], bool]): Test if value is empty.
+        _parent (Optional | None): The source the operations are applied to.
+        _link (tuple | None): The operations to apply, as (previous link, operation).
+        _ops (tuple[tuple[int, Callable], ...] | None): The flattened operations.
 
     """
 
+    __slots__ = ("_is_empty_callback", "_link", "_ops", "_parent", "_value")
+
     _value: T | None
     _is_empty_callback: Callable[[T | None], bool]
+    _parent: "Optional[Any] | None"
+    _link: tuple[Any, tuple[int, Callable[..., Any]]] | None
+    _ops: tuple[tuple[int, Callable[..., Any]], ...] | None
 
     def __init__(
         self,
         value: T | None = None,
-        is_empty: Callable[[T | None], bool] = lambda x: x is None,
+        is_empty: Callable[[T | None], bool] = _is_none,
     ) -> None:
         """Initialize the Optional instance with a value.
 
@@ -44,15 +144,48 @@ class Optional(Generic[T]):
         """
         self._value = value
         self._is_empty_callback = is_empty
+        self._parent = None
+        self._link = None
+        self._ops = ()
 
-    def _is_empty(self, value: T | None) -> bool:
-        """Test if value is empty.
+    def _chain(self, *ops: tuple[int, Callable[..., Any]]) -> "Optional[Any]":
+        """Create a new Optional applying more operations to this one's value.
+
+        Args:
+            ops (tuple[int, Callable]): The kind and function of each operation.
 
         Returns:
-            bool.
+            Optional: A new Optional instance sharing the same source.
 
         """
-        return self._is_empty_callback(value)
+        node: Optional[Any] = Optional.__new__(Optional)
+        node._value = None
+        node._is_empty_callback = self._is_empty_callback
+        node._ops = None
+        link = self._link
+        node._parent = self if link is None else self._parent
+        for op in ops:
+            link = (link, op)
+        node._link = link
+        return node
+
+    def _flat_ops(self) -> tuple[tuple[int, Callable[..., Any]], ...]:
+        """Get the operations of the Optional instance, in order.
+
+        Returns:
+            tuple[tuple[int, Callable], ...]: The operations.
+
+        """
+        ops = self._ops
+        if ops is None:
+            flat = []
+            link = self._link
+            while link is not None:
+                link, op = link
+                flat.append(op)
+            flat.reverse()
+            ops = self._ops = tuple(flat)
+        return ops
 
     def __call__(self, callback: Callable[[T], R]) -> "Optional[R]":
         """Apply the given callback function to the object's state or data and returns
@@ -79,7 +212,7 @@ class Optional(Generic[T]):
             Optional[R]: A new Optional instance with the transformed value.
 
         """
-        return OptionalMap[T, R](parent=self, callback=callback)
+        return self._chain((_MAP, callback))
 
     def flat_map(self, callback: Callable[[T], "Optional[R]"]) -> "Optional[R]":
         """Apply a transformation to the value and flatten the result.
@@ -91,10 +224,7 @@ class Optional(Generic[T]):
             Optional[R]: A new Optional instance with the transformed and flattened value.
 
         """
-        return OptionalMap[T, R](
-            parent=self,
-            callback=lambda x: callback(x)._get_value(),  # type: ignore[arg-type, return-value]
-        )
+        return self._chain((_FLAT_MAP, callback))
 
     def reduce(
         self, optional: "Optional[R]", callback: Callable[[T, R], S]
@@ -110,10 +240,12 @@ class Optional(Generic[T]):
             Optional[S]: A new Optional instance with the reduced value.
 
         """
-        return OptionalMap[T, S](
-            parent=self,
-            callback=lambda x: callback(x, optional._get_value()),  # type: ignore[arg-type]
-        )
+
+        def _reduce(value: T) -> S:
+            other: Any = optional._try_value()
+            return _MISSING if other is _MISSING else callback(value, other)
+
+        return self._chain((_MAP, _reduce))
 
     def filter(self, callback: Callable[[T], bool]) -> "Optional[T]":
         """Filter the value based on a predicate and return a new Optional instance.
@@ -125,7 +257,26 @@ class Optional(Generic[T]):
             Optional[T]: A new Optional instance with the filtered value.
 
         """
-        return OptionalFilter[T](parent=self, callback=callback)  # type: ignore[arg-type]
+        return self._chain((_FILTER, callback))
+
+    def filter_map(
+        self, callback: Callable[[T], R], predicate: Callable[[R], bool]
+    ) -> "Optional[R]":
+        """Apply a transformation to the value, then filter the result.
+
+        Equivalent to `map(callback).filter(predicate)`, without building the
+        intermediate Optional.
+
+        Args:
+            callback (Callable[[T], R]): The transformation function.
+            predicate (Callable[[R], bool]): The predicate function.
+
+        Returns:
+            Optional[R]: A new Optional instance with the transformed and filtered
+                         value.
+
+        """
+        return self._chain((_MAP, callback), (_FILTER, predicate))
 
     def cache(self) -> "Optional[T]":
         """Cache the value and return a new Optional instance.
@@ -147,7 +298,7 @@ class Optional(Generic[T]):
             Optional[T]: A new Optional instance with the same value.
 
         """
-        return OptionalPeek[T](parent=self, callback=callback)  # type: ignore[arg-type]
+        return self._chain((_PEEK, callback))
 
     def if_present(self, callback: Callable[[T | None], None]) -> None:
         """Apply a function to the value if it is present.
@@ -156,11 +307,8 @@ class Optional(Generic[T]):
             callback (Callable[[T], None]): The function to apply.
 
         """
-        try:
-            value: T | None = self._get_value()
-        except MissingValueError:
-            pass
-        else:
+        value: T | None = self._try_value()
+        if value is not _MISSING:
             callback(value)
 
     def is_empty(self) -> bool:
@@ -170,12 +318,7 @@ class Optional(Generic[T]):
             bool: True if the Optional instance is empty, False otherwise.
 
         """
-        try:
-            self._get_value()
-        except MissingValueError:
-            return True
-        else:
-            return False
+        return self._try_value() is _MISSING
 
     def __bool__(self) -> bool:
         """Check if the Optional instance is not empty.
@@ -202,6 +345,8 @@ class Optional(Generic[T]):
            str.
 
         """
+        if self._parent is not None:
+            return f"{self._parent!r} >> <{self.__class__.__name__} at {hex(id(self))}>"
         return f"<{self.__class__.__name__}({self._value}) at {hex(id(self))}>"
 
     def __float__(self) -> float:
@@ -395,6 +540,84 @@ class Optional(Generic[T]):
             lambda a, b: a >= b,
         ).get(default=False)
 
+    def _try_value(self) -> T | None:
+        """Get the value of the Optional instance, or _MISSING if not present.
+
+        Returns:
+            T | None: The value of the Optional instance, or _MISSING.
+
+        """
+        parent = self._parent
+        if parent is None:
+            return self._source_value()
+        if parent._parent is None:
+            # A single segment over a source: no stack to build.
+            return _HANDLERS[type(self)](self, parent._value)
+
+        stack: list[Optional[Any]] = []
+        push = stack.append
+        node: Optional[Any] = self
+        while node._parent is not None:
+            push(node)
+            node = node._parent
+
+        # The first handler tests the raw value of the source for emptiness.
+        handlers = _HANDLERS
+        value: Any = node._value
+        for node in reversed(stack):
+            value = handlers[type(node)](node, value)
+        return value
+
+    def _source_value(self) -> T | None:
+        """Get the value the operations of the chain are applied to.
+
+        Returns:
+            T | None: The value of the source, or _MISSING.
+
+        """
+        return self._apply_ops(self._value)
+
+    def _apply_ops(self, value: Any) -> Any:  # noqa: ANN401
+        """Apply the operations of the Optional instance to a value.
+
+        This is the only place where values are tested for emptiness: the source
+        value and every value produced by a map or flat_map go back through the same
+        test at the top of the loop, where the default None test is inlined.
+
+        Args:
+            value (Any): The value of the source, or _MISSING.
+
+        Returns:
+            Any: The transformed value, or _MISSING.
+
+        """
+        is_empty = self._is_empty_callback
+        is_none = is_empty is _is_none
+        remaining = iter(self._flat_ops())
+        while value is not _MISSING and not (
+            value is None if is_none else is_empty(value)
+        ):
+            for tag, callback in remaining:
+                if tag == _MAP:
+                    value = callback(value)
+                    break
+                if tag == _FILTER:
+                    if not callback(value):
+                        return _MISSING
+                elif tag == _PEEK:
+                    callback(copy(value))
+                else:
+                    inner = callback(value)
+                    # A freshly built Optional is its own source: read it directly.
+                    if inner._parent is None:
+                        value = inner._source_value()
+                    else:
+                        value = inner._try_value()
+                    break
+            else:
+                return value
+        return _MISSING
+
     def _get_value(self) -> T | None:
         """Get the value of the Optional instance.
 
@@ -405,9 +628,10 @@ class Optional(Generic[T]):
             MissingValueError: If the value is not present.
 
         """
-        if self._is_empty(self._value):
+        value: T | None = self._try_value()
+        if value is _MISSING:
             raise MissingValueError
-        return self._value
+        return value
 
     def get(
         self,
@@ -438,15 +662,25 @@ class Optional(Generic[T]):
             is provided.
 
         """
-        try:
-            value: T | None = self._get_value()
-        except MissingValueError as err:
-            try:
-                return kwargs["default"]  # type: ignore[assignment]
-            except KeyError:
-                raise exception from err
-        else:
+        value: T | None = self._value
+        if (
+            value is not None
+            and self._parent is None
+            and self._is_empty_callback is _is_none
+            and type(self) is Optional
+        ):
+            return value
+
+        value = self._try_value()
+        if value is not _MISSING:
             return value  # type: ignore[return-value]
+        if "default" in kwargs:
+            return kwargs["default"]
+        if isinstance(exception, MissingValueError) or (
+            isinstance(exception, type) and issubclass(exception, MissingValueError)
+        ):
+            raise exception
+        raise exception from MissingValueError()
 
     def get_or_else(self, callback: Callable[[], T]) -> T:
         """Get the value of the Optional instance, or a value provided by a function
@@ -459,164 +693,174 @@ class Optional(Generic[T]):
             T: The value of the Optional instance, or the value provided by the function.
 
         """
-        try:
-            return self._get_value()  # type: ignore[return-value]
-        except MissingValueError:
+        value: T | None = self._try_value()
+        if value is _MISSING:
             return callback()
+        return value  # type: ignore[return-value]
 
+    def compile(self) -> Callable[[Any], T]:
+        """Compile the operations of the chain into a function applying them to any
+        value, for pipelines run on many values.
 
-class OptionalEmpty(Optional):
-    def __init__(self) -> None:
-        super().__init__()
-
-    def _is_empty(self, value) -> bool:  # noqa: ARG002,ANN001
-        return True
-
+        The chain is walked up to its root, whose value is replaced by the argument of
+        the compiled function. cache() has no effect inside the compiled function. A
+        cache() that has already been evaluated released the operations upstream of
+        it, so a chain going through one cannot be compiled.
 
-class OptionalError(OptionalEmpty):
-    _exception: BaseException
+        Example:
+            pipeline = Optional().map(lambda x: x * 2).filter(lambda x: x > 15)
+            run = pipeline.compile()
+            run(10)  # 20
+            run(5)  # raises MissingValueError
 
-    def __init__(self, exception: BaseException) -> None:
-        super().__init__()
-        self._exception = exception
+        Returns:
+            Callable[[Any], T]: A function taking the source value and returning the
+                                result of the chain.
 
-    def get(self, exception=MissingValueError, **kwargs) -> Any:  # noqa: ARG002,ANN001,ANN003,ANN401
-        return super().get(exception=self._exception, **kwargs)
+        Raises:
+            ValueError: If the chain goes through an evaluated cache().
+            MissingValueError: From the compiled function, if the result is empty.
 
+        """
+        return self._compile(batch=False)
 
-class OptionalTransform(ABC, Generic[T, R], Optional[R]):
-    """An abstract base class for transforming Optional values.
+    def apply(self, values: Iterable[Any]) -> Iterator[T]:
+        """Apply the operations of the chain to each value of an iterable, skipping
+        the empty results.
 
-    Attributes:
-        _parent (Optional): The parent optional value.
-        _callback (Callable[[T], R]): The transformation function.
+        The chain is compiled once, as with compile(), into a single loop over the
+        values.
 
-    """
+        Example:
+            pipeline = Optional().map(lambda x: x * 2).filter(lambda x: x > 15)
+            list(pipeline.apply([5, 10, None, 20]))  # [20, 40]
 
-    _parent: "Optional[Any]"
-    _callback: Callable[..., R] | None = None
+        Args:
+            values (Iterable[Any]): The source values.
 
-    def __init__(
-        self, parent: Optional[T], callback: Callable[..., R] | None = None
-    ) -> None:
-        """Initialize the OptionalTransform instance.
+        Returns:
+            Iterator[T]: The non-empty results, in order.
 
-        Args:
-            parent (Optional): The parent Optional instance.
-            callback (Callable[[T], R]): The transformation function.
+        Raises:
+            ValueError: If the chain goes through an evaluated cache().
 
         """
-        self._parent = parent
-        self._callback = callback
+        return self._compile(batch=True)(values)
 
-    def _is_empty(self, value: R | None) -> bool:
-        """Test if parent value is empty.
+    def _compile(self, *, batch: bool) -> Callable[[Any], Any]:
+        """Compile the operations of the chain.
+
+        Args:
+            batch (bool): Compile a generator over an iterable of values.
 
         Returns:
-            bool.
+            Callable[[Any], Any]: The compiled function.
+
+        Raises:
+            ValueError: If the chain goes through an evaluated cache().
 
         """
-        return self._parent._is_empty(value)
+        segments: list[tuple[tuple[int, Callable[..., Any]], ...]] = []
+        node: Optional[Any] = self
+        while node._parent is not None:
+            segments.append(node._flat_ops())
+            node = node._parent
+        # An evaluated cache has released its parent: the upstream operations are gone.
+        if type(node) is OptionalCache:
+            msg = "cannot compile a chain through an evaluated cache()"
+            raise ValueError(msg)
+        ops = [op for segment in reversed(segments) for op in segment]
 
-    def __repr__(self) -> str:
-        """Get the string representation of the Optional class.
+        is_empty = self._is_empty_callback
+        make = _compile_ops(tuple(tag for tag, _ in ops), is_empty is _is_none, batch)
+        return make(is_empty, *(callback for _, callback in ops))
 
-        Returns:
-           str.
 
-        """
-        return f"{self._parent!r} >> <{self.__class__.__name__} at {hex(id(self))}>"
+class OptionalEmpty(Optional):
+    __slots__ = ()
 
-    @abstractmethod
-    def _get_value(self) -> R | None:
-        """Get the transformed value of the Optional instance.
+    def __init__(self) -> None:
+        super().__init__(is_empty=_is_always_empty)
 
-        Returns:
-            R | None: The transformed value of the Optional instance.
 
-        """
+class OptionalError(OptionalEmpty):
+    __slots__ = ("_exception",)
 
+    _exception: BaseException
 
-class OptionalMap(OptionalTransform[T, R]):
-    """A class for mapping Optional values."""
+    def __init__(self, exception: BaseException) -> None:
+        super().__init__()
+        self._exception = exception
 
-    def _get_value(self) -> R | None:
-        """Run the transformation and return the result.
+    def get(self, exception=MissingValueError, **kwargs) -> Any:  # noqa: ARG002,ANN001,ANN003,ANN401
+        return super().get(exception=self._exception, **kwargs)
 
-        Returns:
-            R | None: The result of the transformation.
 
-        """
-        value: T | None = self._parent._get_value()
-        new_value: R | None = self._callback(value)  # type: ignore[misc]
-        if self._is_empty(new_value):
-            raise MissingValueError
-        return new_value  # type: ignore[misc]
+class OptionalCache(Optional[T]):
+    """A class for caching Optional values."""
 
+    __slots__ = ("_cached",)
 
-class OptionalFilter(OptionalTransform[T, T]):
-    """A class for filtering Optional values."""
+    _cached: bool
 
-    def _get_value(self) -> T | None:
-        """Run the filter and return the result.
+    def __init__(self, parent: Optional[T]) -> None:
+        """Initialize the OptionalCache instance.
 
-        Returns:
-            T | None: The filtered result.
+        Args:
+            parent (Optional): The Optional instance to cache.
 
         """
-        value: T | None = self._parent._get_value()
-        if self._callback(value):  # type: ignore[misc]
-            return value
-        raise MissingValueError
-
-
-class OptionalPeek(OptionalTransform[T, T]):
-    """A class for peeking Optional values."""
+        self._value = None
+        self._is_empty_callback = parent._is_empty_callback
+        self._parent = parent
+        self._link = None
+        self._ops = ()
+        self._cached = False
 
-    def _get_value(self) -> T | None:
-        """Run the function and return the original value.
+    def is_cached(self) -> bool:
+        """Test if value is in cache.
 
         Returns:
-            T | None: The original value.
+            bool.
 
         """
-        value: T | None = self._parent._get_value()
-        self._callback(copy(value))  # type: ignore[misc]
-        return value
+        return self._cached
 
-
-class OptionalCache(OptionalTransform[T, T]):
-    """A class for caching Optional values."""
-
-    def is_cached(self) -> bool:
-        """Test if value is in cache.
+    def _source_value(self) -> T | None:
+        """Get the cached value.
 
         Returns:
-            bool.
+            T | None: The cached value, or _MISSING.
 
         """
-        return getattr(self, "_cached", False)
+        return self._value
 
-    def _get_value(self) -> T | None:
+    def _store(self, value: T | None) -> T | None:
         """Cache the value and return the result.
 
+        Args:
+            value (T | None): The value of the parent, or _MISSING.
+
         Returns:
-            T | None: The cached value.
+            T | None: The cached value, or _MISSING.
 
         """
-        if not self.is_cached():
-            try:
-                self._value: T | None = self._parent._get_value()
-            finally:
-                self._cached = True
+        value = self._apply_ops(value)
+        self._value = value
+        self._cached = True
+        # The parent chain is never evaluated again: release it.
+        self._parent = None
+        return value
 
-        if not hasattr(self, "_value") or self._is_empty(self._value):
-            raise MissingValueError
-        return self._value
+
+_HANDLERS: dict[type[Optional[Any]], Callable[[Any, Any], Any]] = {
+    Optional: Optional._apply_ops,
+    OptionalCache: OptionalCache._store,
+}
 
 
 def optional(
-    is_empty: Callable[[T | None], bool] = lambda x: x is None,
+    is_empty: Callable[[T | None], bool] = _is_none,
     catch: bool = False,  # noqa: FBT001, FBT002
 ) -> Callable[[Callable[..., T]], Callable[..., Optional]]:
     """Wrap a function and return an Optional object.
@@ -1,3 +1,5 @@
+import weakref
+
 import pytest
 
 from optional import MissingValueError, Optional, OptionalError, optional
@@ -50,6 +52,18 @@ def test_filter() -> None:
     assert optional.filter(lambda x: x < 5).is_empty()
 
 
+def test_filter_map() -> None:
+    assert Optional(10).filter_map(lambda x: x * 2, lambda x: x > 15).get() == 20
+    assert Optional(10).filter_map(lambda x: x * 2, lambda x: x > 25).is_empty()
+    assert Optional(10).filter_map(lambda x: None, lambda x: True).is_empty()
+
+    optional = Optional(10).filter_map(lambda x: x * 2, lambda x: x > 15)
+    assert len(optional._flat_ops()) == 2
+    assert optional.get() == 20
+    assert optional.filter(lambda x: x > 25).is_empty()
+    assert optional.map(lambda x: x + 1).get() == 21
+
+
 def test_peek() -> None:
     optional = Optional(10)
     called = []
@@ -60,6 +74,13 @@ def test_peek() -> None:
     assert optional.peek(callback).get() == 10
     assert called
 
+    called.clear()
+    assert Optional().peek(callback).is_empty()
+    assert not called
+
+    value = [1]
+    assert Optional(value).peek(lambda x: x.append(2)).get() == [1]
+
 
 def test_if_present() -> None:
     optional = Optional(10)
@@ -89,6 +110,47 @@ def test_cache() -> None:
     assert optional.map(lambda x: x**2).is_empty()
     assert optional.map(lambda x: x**2).is_empty()
 
+    called = []
+    optional = Optional(2).peek(called.append).cache()
+    assert not optional.is_cached()
+    assert optional.get() == 2
+    assert optional.is_cached()
+    assert optional.map(lambda x: x**2).get() == 4
+    assert called == [2]
+
+
+def test_cache_releases_parent() -> None:
+    class Payload:
+        pass
+
+    payload = Payload()
+    ref = weakref.ref(payload)
+    optional = Optional(2).map(lambda x, payload=payload: x).cache()
+    del payload
+
+    assert ref() is not None
+    assert optional.get() == 2
+    assert ref() is None
+    assert optional.map(lambda x: x**2).get() == 4
+
+    payload = Payload()
+    ref = weakref.ref(payload)
+    optional = Optional(payload).map(lambda _: 2).cache()
+    del payload
+
+    assert ref() is not None
+    assert optional.get() == 2
+    assert ref() is None
+
+    payload = Payload()
+    ref = weakref.ref(payload)
+    optional = Optional(payload).cache().map(lambda _: 2).cache()
+    del payload
+
+    assert ref() is not None
+    assert optional.get() == 2
+    assert ref() is None
+
 
 def test_bool() -> None:
     assert Optional(42)
@@ -111,6 +173,10 @@ def test_null_value() -> None:
         Optional(21, is_empty=lambda x: x == 42).map(lambda x: x * 2).get(default=0) == 0
     )
 
+    optional = Optional(20, is_empty=lambda x: x == 42).map(lambda x: x + 1).cache()
+    assert optional.map(lambda x: x * 2).is_empty()
+    assert optional.filter(lambda x: x > 0).flat_map(lambda x: Optional(x * 2)).is_empty()
+
 
 def test_reduce() -> None:
     assert Optional(10).reduce(Optional(20), lambda a, b: a).get() == 10
@@ -170,8 +236,9 @@ def test_error() -> None:
     assert opt.is_empty()
     assert type(opt._exception) is KeyError
 
-    with pytest.raises(KeyError):
+    with pytest.raises(KeyError) as excinfo:
         opt.get()
+    assert type(excinfo.value.__cause__) is MissingValueError
 
     assert opt.map(lambda x: x + 2).is_empty()
 
@@ -238,3 +305,109 @@ def test_chained_methods() -> None:
     )  # Get value or else 0 -> 30
 
     assert result == 30
+
+
+def test_long_chain() -> None:
+    optional = Optional(0)
+    for _ in range(100_000):
+        optional = optional.map(lambda x: x + 1)
+
+    assert optional.get() == 100_000
+
+    optional = Optional(0)
+    for _ in range(100_000):
+        optional = optional.flat_map(lambda x: Optional(x + 1))
+
+    assert optional.get() == 100_000
+
+    optional = Optional(0)
+    for _ in range(5_000):
+        optional = optional.map(lambda x: x + 1).cache()
+
+    assert optional.get() == 5_000
+
+
+def test_slots() -> None:
+    assert not hasattr(Optional(10), "__dict__")
+    assert not hasattr(Optional(10).map(lambda x: x * 2), "__dict__")
+    assert not hasattr(Optional(10).cache(), "__dict__")
+    assert not hasattr(OptionalError(KeyError()), "__dict__")
+
+
+def test_successive_operations() -> None:
+    optional = Optional(21, is_empty=lambda x: x == 42)
+    called = []
+
+    def callback(value) -> int:
+        called.append(value)
+        return value
+
+    assert optional.map(lambda x: x * 2).map(callback).is_empty()
+    assert not called
+    assert optional.map(lambda x: x + 1).map(callback).get() == 22
+    assert called == [22]
+
+    assert Optional(10).filter(lambda x: x > 5).filter(lambda x: x < 20)
+    assert not Optional(10).filter(lambda x: x > 5).filter(lambda x: x > 20)
+
+    peeked: list = []
+    Optional([1]).peek(lambda x: x.append(2)).peek(peeked.append).get()
+    assert peeked == [[1]]
+
+
+def test_compile() -> None:
+    called = []
+    pipeline = (
+        Optional()
+        .map(lambda x: x * 2)
+        .filter(lambda x: x > 15)
+        .flat_map(lambda x: Optional(x + 10))
+        .peek(called.append)
+        .cache()
+        .map(lambda x: x + 1)
+    )
+    run = pipeline.compile()
+
+    assert run(10) == 31
+    assert called == [30]
+    assert run(20) == 51
+    with pytest.raises(MissingValueError):
+        run(5)
+    with pytest.raises(MissingValueError):
+        run(None)
+    assert pipeline.is_empty()
+    with pytest.raises(ValueError, match="evaluated cache"):
+        pipeline.compile()
+
+    run = Optional(is_empty=lambda x: x == 42).map(lambda x: x * 2).compile()
+    assert run(10) == 20
+    with pytest.raises(MissingValueError):
+        run(21)
+    with pytest.raises(MissingValueError):
+        run(42)
+
+
+def test_apply() -> None:
+    pipeline = (
+        Optional()
+        .map(lambda x: x * 2)
+        .filter(lambda x: x > 15)
+        .flat_map(lambda x: Optional(x + 10))
+    )
+    assert list(pipeline.apply([5, 10, None, 20])) == [30, 50]
+    assert list(Optional.apply(pipeline, range(7, 10))) == [26, 28]
+    assert list(Optional().apply([1, None, 2])) == [1, 2]
+    assert list(Optional(is_empty=lambda x: x < 0).apply([1, -1, 2])) == [1, 2]
+
+    pipeline = (
+        Optional(7)
+        .map(lambda x: x * 2)
+        .filter(lambda x: x > 15)
+        .flat_map(lambda x: Optional(x + 10))
+        .cache()
+        .map(lambda x: x + 1)
+    )
+    assert list(pipeline.apply([10, 20, 5])) == [31, 51]
+    assert pipeline.is_empty()
+    with pytest.raises(ValueError, match="evaluated cache"):
+        pipeline.apply([10, 20, 5])